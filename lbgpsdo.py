@@ -20,12 +20,13 @@
 #
 
 import argparse
+import contextlib
 from fractions import Fraction
-import hid
-import json
 import math
+import operator
 import struct
 import sys
+import time
 
 
 
@@ -35,6 +36,103 @@ USBIDS = \
     ( 0x1dd2, 0x2211 ),
 ]
 
+_USBIDS_SET = frozenset(USBIDS)
+
+# Result of the last USB bus scan, which is reused for `_ENUM_CACHE_TTL`
+# seconds.
+_ENUM_CACHE = { 't': 0, 'v': None }
+_ENUM_CACHE_TTL = 0.25
+
+# Layout of the PLL report. The 24 bit fields are packed as three single
+# bytes, see `_pll_report()`.
+_PLL_REPORT = struct.Struct(
+    "<"
+    "B"     # Command
+    "BBB"   # fin
+    "BBB"   # N3 - 1
+    "B"     # N2_HS - 4
+    "BBB"   # N2_LS - 1
+    "B"     # N1_HS - 4
+    "BBB"   # NC1_LS - 1
+    "BBB"   # NC2_LS - 1
+    "B"     # SKEW
+    "B"     # BWSEL
+    "40x")
+_pll_report_pack = _PLL_REPORT.pack
+
+# Empty feature report.
+_REPORT_EMPTY = bytes(60)
+
+# Settings transferred by the PLL report.
+_PLL_KEYS  = ( 'fin', 'n3', 'n2_hs', 'n2_ls', 'n1_hs', 'nc1_ls', 'nc2_ls', 'skew', 'bw' )
+_pll_attrs = operator.attrgetter(*_PLL_KEYS)
+_pll_items = operator.itemgetter(*_PLL_KEYS)
+
+# PLL diagram shown by `GPSDO.plltext()`.
+_PLL_DIAGRAM = \
+(
+    "  fin          f3   +-------+                                       fout1  \n"
+    "------> ÷ N3 -----> |       |   fosc                 +-> ÷ NC1_LS -------->\n"
+    "                    |  PLL  | --------+--> ÷ N1_HS --|                     \n"
+    "          +-------> |       |         |              +-> ÷ NC2_LS -------->\n"
+    "          |         +-------+         |                             fout2  \n"
+    "          |                           |                                    \n"
+    "          +-- ÷ N2_LS <--- ÷ N2_HS <--+                                    \n"
+)
+
+
+
+def _u24(buf, offset):
+    """
+    Decodes a 24 bit little endian integer from `buf` at `offset`.
+    """
+
+    return buf[offset] | (buf[offset + 1] << 8) | (buf[offset + 2] << 16)
+
+
+def _pll_report(command, fin, n3, n2_hs, n2_ls, n1_hs, nc1_ls, nc2_ls, skew, bw):
+    """
+    Encodes the PLL report.
+
+    The settings are passed in the order of `_PLL_KEYS` and converted to the
+    register values expected by the device.
+    """
+
+    n3     -= 1
+    n2_ls  -= 1
+    nc1_ls -= 1
+    nc2_ls -= 1
+
+    return _pll_report_pack(
+        command,
+        fin    & 0xff, (fin    >> 8) & 0xff, (fin    >> 16) & 0xff,
+        n3     & 0xff, (n3     >> 8) & 0xff, (n3     >> 16) & 0xff,
+        n2_hs - 4,
+        n2_ls  & 0xff, (n2_ls  >> 8) & 0xff, (n2_ls  >> 16) & 0xff,
+        n1_hs - 4,
+        nc1_ls & 0xff, (nc1_ls >> 8) & 0xff, (nc1_ls >> 16) & 0xff,
+        nc2_ls & 0xff, (nc2_ls >> 8) & 0xff, (nc2_ls >> 16) & 0xff,
+        skew,
+        bw)
+
+
+
+_hid = None
+
+def _get_hid():
+    """
+    Returns the HID library module.
+
+    The HID library is imported on first use, so that pure calculations don't
+    depend on it.
+    """
+
+    global _hid
+    if _hid is None:
+        import hid
+        _hid = hid
+    return _hid
+
 
 
 class GPSDOConfigurationException(Exception):
@@ -46,10 +144,10 @@ class GPSDOConfigurationException(Exception):
     """
 
     def errortext(self):
-        result = ""
+        parts = []
         for attr, msg in self.args[0].items():
-            result += "%-7s %s\n" % ( attr + ":", msg )
-        return result
+            parts.append("%-7s %s\n" % ( attr + ":", msg ))
+        return "".join(parts)
 
 
 
@@ -60,9 +158,29 @@ class GPSDO(object):
     Used for clock calculations.
     """
 
+    __slots__ = \
+    (
+        'out1',
+        'out2',
+        'level',
+        'fin',
+        'n3',
+        'n2_hs',
+        'n2_ls',
+        'n1_hs',
+        'nc1_ls',
+        'nc2_ls',
+        'skew',
+        'bw',
+        '_plan_cache',
+    )
+
     OUTPUT1 = 0x01
     OUTPUT2 = 0x02
 
+    # Output register value indexed by `(out1 << 1) | out2`.
+    _OUTPUT_LUT = ( 0, OUTPUT2, OUTPUT1, OUTPUT1 | OUTPUT2 )
+
     LEVEL_VALUE_8MA  = 0
     LEVEL_VALUE_16MA = 1
     LEVEL_VALUE_24MA = 2
@@ -136,6 +254,22 @@ class GPSDO(object):
         ( 'fout2', "Output 2 frequency",       LIMIT_FOUT_MIN, LIMIT_FOUT_MAX, "must be in the range of 450 Hz to 808 MHz"    ),
     ]
 
+    # Same as `_CONFIG_CHECKS` and `_FREQ_CHECKS` extended by an attribute
+    # getter and the message for undefined values for each row.
+    _CONFIG_CHECK_FAST = tuple(
+        ( attr, name, vmin, vmax, even, msg, operator.attrgetter(attr), "%s undefined." % name )
+        for attr, name, vmin, vmax, even, msg in _CONFIG_CHECKS)
+
+    _FREQ_CHECK_FAST = tuple(
+        ( attr, name, lmin, lmax, msg, "%s undefined." % name )
+        for attr, name, lmin, lmax, msg in _FREQ_CHECKS)
+
+    # Display units and their scaling factors.
+    _FREQ_UNITS      = ( "Hz", "kHz", "MHz", "GHz" )
+    _FREQ_SCALES     = ( 1, 1000, 1000000, 1000000000 )
+    _DURATION_UNITS  = ( "s", "ms", "µs", "ns", "ps" )
+    _DURATION_SCALES = ( 1, 1000, 1000000, 1000000000, 1000000000000 )
+
 
     def __init__(self, *args, **kwargs):
         self.out1   = False
@@ -151,6 +285,8 @@ class GPSDO(object):
         self.skew   = 0
         self.bw     = 15
 
+        self._plan_cache = None
+
 
     def update(self, *args, **kwargs):
         """
@@ -191,13 +327,14 @@ class GPSDO(object):
         level = kwargs.pop('level', None)
 
         errdict = {}
+        staged  = []
 
-        # Check the arguments first.
-        for attr, name, vmin, vmax, even, msg in self._CONFIG_CHECKS:
-            if attr not in kwargs:
-                continue
+        kwargs_pop = kwargs.pop
 
-            value = kwargs[attr]
+        # Check the arguments first. Valid settings are staged and only
+        # applied if all arguments are valid.
+        for attr, name, vmin, vmax, even, msg, getter, undefined in self._CONFIG_CHECK_FAST:
+            value = kwargs_pop(attr, None)
             if value is None:
                 continue
 
@@ -217,6 +354,9 @@ class GPSDO(object):
                 errdict[attr] = "%s must be even." % name
                 continue
 
+            if attr not in errdict:
+                staged.append(( attr, value ))
+
         if level is not None and (level < 0 or level > 3):
             errdict['level'] = "Invalid drive level."
 
@@ -224,10 +364,7 @@ class GPSDO(object):
             raise GPSDOConfigurationException(errdict)
 
         # Update the PLL settings.
-        for attr, name, vmin, vmax, even, msg in self._CONFIG_CHECKS:
-            value = kwargs.pop(attr, None)
-            if value is None:
-                continue
+        for attr, value in staged:
             setattr(self, attr, value)
 
         if out1 is not None:
@@ -237,6 +374,8 @@ class GPSDO(object):
         if level is not None:
             self.level = level
 
+        self._plan_cache = None
+
 
     def asdict(self, ignore_freq_limits = False):
         """
@@ -302,6 +441,8 @@ class GPSDO(object):
         If `modify` is `True`, the method will set unused output dividers
         to reasonable default values if they are undefined.
 
+        The result is cached until the settings are changed.
+
         :param modify: Enable output 1.
         :type modify: bool
 
@@ -333,20 +474,56 @@ class GPSDO(object):
                 if self.nc2_ls is None:
                     self.nc2_ls = 5670
 
+        # Return the cached frequency plan if the settings are unchanged.
+        key = \
+            (
+                self.fin,
+                self.n3,
+                self.n2_hs,
+                self.n2_ls,
+                self.n1_hs,
+                self.nc1_ls,
+                self.nc2_ls,
+                self.skew,
+                ignore_freq_limits,
+            )
+
+        if self._plan_cache is not None and self._plan_cache[0] == key:
+            freq, errdict, errflag = self._plan_cache[1]
+            return dict(freq), dict(errdict), errflag
+
         errdict = {}
 
         # Check for undefined settings.
-        for attr, name, lmin, lmax, even, msg in self._CONFIG_CHECKS:
-            errdict[attr] = ("%s undefined." % name) if getattr(self, attr, None) is None else None
-
-        # Compute frequency plan.
-        f3            = None if self.fin    is None or self.n3    is None                        else Fraction(self.fin, self.n3)
-        fosc          = None if f3          is None or self.n2_hs is None or self.n2_ls  is None else f3 * self.n2_hs * self.n2_ls
-        fout1         = None if fosc        is None or self.n1_hs is None or self.nc1_ls is None else fosc / (self.n1_hs * self.nc1_ls)
-        fout2         = None if fosc        is None or self.n1_hs is None or self.nc2_ls is None else fosc / (self.n1_hs * self.nc2_ls)
-        phase         = None if fosc        is None or self.n1_hs is None or self.skew   is None else self.skew * self.n1_hs / fosc
-        phaseres      = None if fosc        is None or self.n1_hs is None                        else self.n1_hs / fosc
-        phaseangle    = None if self.nc2_ls is None or self.skew  is None                        else Fraction(self.skew % self.nc2_ls, self.nc2_ls)
+        for attr, name, lmin, lmax, even, msg, getter, undefined in self._CONFIG_CHECK_FAST:
+            errdict[attr] = undefined if getter(self) is None else None
+
+        # Compute frequency plan. The frequencies are computed as integer
+        # tuples ( numerator, denominator ) and converted into fractions at
+        # the end, so that each value is reduced only once.
+        f3            = None if self.fin    is None or self.n3    is None                        else ( self.fin, self.n3 )
+        fosc          = None if f3          is None or self.n2_hs is None or self.n2_ls  is None else ( f3[0] * self.n2_hs * self.n2_ls, f3[1] )
+        fout1         = None if fosc        is None or self.n1_hs is None or self.nc1_ls is None else ( fosc[0], fosc[1] * self.n1_hs * self.nc1_ls )
+        fout2         = None if fosc        is None or self.n1_hs is None or self.nc2_ls is None else ( fosc[0], fosc[1] * self.n1_hs * self.nc2_ls )
+        phase         = None if fosc        is None or self.n1_hs is None or self.skew   is None else ( self.skew * self.n1_hs * fosc[1], fosc[0] )
+        phaseres      = None if fosc        is None or self.n1_hs is None                        else ( self.n1_hs * fosc[1], fosc[0] )
+        phaseangle    = None if self.nc2_ls is None or self.skew  is None                        else ( self.skew % self.nc2_ls, self.nc2_ls )
+
+        ratio = \
+        {
+            'f3':    f3,
+            'fosc':  fosc,
+            'fout1': fout1,
+            'fout2': fout2,
+        }
+
+        f3            = None if f3          is None                                              else Fraction(*f3)
+        fosc          = None if fosc        is None                                              else Fraction(*fosc)
+        fout1         = None if fout1       is None                                              else Fraction(*fout1)
+        fout2         = None if fout2       is None                                              else Fraction(*fout2)
+        phase         = None if phase       is None                                              else Fraction(*phase)
+        phaseres      = None if phaseres    is None                                              else Fraction(*phaseres)
+        phaseangle    = None if phaseangle  is None                                              else Fraction(*phaseangle)
         phaseangleres = None if self.nc2_ls is None                                              else Fraction(1, self.nc2_ls) 
 
         freq = \
@@ -361,17 +538,21 @@ class GPSDO(object):
             'phaseangleres': phaseangleres,
         }
 
-        # Check allowed frequency ranges.
-        for attr, name, lmin, lmax, msg in self._FREQ_CHECKS:
-            value = freq[attr]
-            if value is None:
-                errdict[attr] = "%s undefined." % name
-            elif ignore_freq_limits:
-                errdict[attr] = None
-            elif value < lmin or value > lmax:
-                errdict[attr] = "%s is %s, but %s." % ( name, self._format_freq(value), msg )
-            else:
-                errdict[attr] = None
+        # Check allowed frequency ranges. The limits are compared against the
+        # integer tuples to avoid dividing. If the limits are ignored, only
+        # undefined frequencies are reported.
+        if ignore_freq_limits:
+            for attr, name, lmin, lmax, msg, undefined in self._FREQ_CHECK_FAST:
+                errdict[attr] = undefined if ratio[attr] is None else None
+        else:
+            for attr, name, lmin, lmax, msg, undefined in self._FREQ_CHECK_FAST:
+                value = ratio[attr]
+                if value is None:
+                    errdict[attr] = undefined
+                elif value[0] < lmin * value[1] or value[0] > lmax * value[1]:
+                    errdict[attr] = "%s is %s, but %s." % ( name, self._format_freq(freq[attr]), msg )
+                else:
+                    errdict[attr] = None
 
         # Check skew.
         if self.skew is not None and self.nc2_ls is not None:
@@ -382,32 +563,140 @@ class GPSDO(object):
         if 'skew' not in errdict:
             errdict['skew'] = None
 
-        return freq, errdict, any([ v is not None for v in errdict.values() ])
+        errflag = any(v is not None for v in errdict.values())
+
+        self._plan_cache = ( key, ( freq, errdict, errflag ) )
+
+        return dict(freq), dict(errdict), errflag
+
+
+    @classmethod
+    def solve_plan(cls, fin, n3, fout1, fout2 = None):
+        """
+        Searches divider settings for the given output frequencies.
+
+        The method enumerates all settings of the feedback and output dividers
+        which exactly produce the output frequencies `fout1` and `fout2` for
+        the GPS reference frequency `fin` and the input divider `n3`. Only
+        settings which keep the intermediate frequencies within the limits
+        specified in the datasheet are returned. If `fout2` is `None`, the
+        output 2 divider is not searched.
+
+        Every solution is returned as a dictionary of divider settings which
+        can be passed to the `update()` method. The search is done by means of
+        the `numpy` package, which has to be installed for this method.
+
+        :param fin: GPS reference frequency.
+        :type fin: int
+        :param n3: Input divider factor N3.
+        :type n3: int
+        :param fout1: Output 1 frequency.
+        :type fout1: int
+        :param fout2: Output 2 frequency.
+        :type fout2: int | None
+
+        :returns: Divider settings
+        :rtype: list of dict
+        """
+
+        import numpy as np
+
+        limits = { attr: ( vmin, vmax ) for attr, name, vmin, vmax, even, msg in cls._CONFIG_CHECKS }
+
+        fouts = [ ( 'nc1_ls', fout1 ) ]
+        if fout2 is not None:
+            fouts.append(( 'nc2_ls', fout2 ))
+
+        # Check the frequencies which don't depend on the search.
+        if fin < cls.LIMIT_F3_MIN * n3 or fin > cls.LIMIT_F3_MAX * n3:
+            return []
+        for attr, fout in fouts:
+            if fout < cls.LIMIT_FOUT_MIN or fout > cls.LIMIT_FOUT_MAX:
+                return []
+
+        # Compute n3 * fosc for every feedback divider setting and keep only
+        # the settings within the oscillator frequency limits. N2_LS must be
+        # even.
+        n2_hs = np.arange(limits['n2_hs'][0], limits['n2_hs'][1] + 1,    dtype = np.int64)
+        n2_ls = np.arange(limits['n2_ls'][0], limits['n2_ls'][1] + 1, 2, dtype = np.int64)
+        fosc  = fin * (n2_hs[:, None] * n2_ls[None, :])
+
+        valid = (fosc >= cls.LIMIT_FOSC_MIN * n3) & (fosc <= cls.LIMIT_FOSC_MAX * n3)
+        n2_hs_idx, n2_ls_idx = np.nonzero(valid)
+        fosc = fosc[n2_hs_idx, n2_ls_idx]
+
+        # The output frequency is fosc / (N1_HS * NCx_LS), so the total
+        # output divider must be an integer.
+        outputs = []
+        for attr, fout in fouts:
+            outputs.append(( attr, fosc // (n3 * fout), fosc % (n3 * fout) == 0 ))
+
+        result = []
+        for n1_hs in range(limits['n1_hs'][0], limits['n1_hs'][1] + 1):
+            mask = np.ones(len(fosc), dtype = bool)
+            ncs = []
+            for attr, div, exact in outputs:
+                nc_ls = div // n1_hs
+                mask &= exact & (div % n1_hs == 0) & (nc_ls % 2 == 0)
+                mask &= (nc_ls >= limits[attr][0]) & (nc_ls <= limits[attr][1])
+                ncs.append(( attr, nc_ls ))
+
+            for i in np.nonzero(mask)[0]:
+                solution = \
+                {
+                    'n2_hs': int(n2_hs[n2_hs_idx[i]]),
+                    'n2_ls': int(n2_ls[n2_ls_idx[i]]),
+                    'n1_hs': n1_hs,
+                }
+                for attr, nc_ls in ncs:
+                    solution[attr] = int(nc_ls[i])
+                result.append(solution)
+
+        result.sort(key = lambda s: ( s['n2_hs'], s['n2_ls'], s['n1_hs'] ))
+
+        return result
 
 
     def _scale_freq(self, value):
         if value is None:
             return None, None
 
-        for u in [ "Hz", "kHz", "MHz", "GHz" ]:
-            if value < 1000:
-                return value, u
-            value /= 1000
+        if value <= 0:
+            return value, "Hz"
+
+        idx = min(len(self._FREQ_UNITS) - 1, max(0, int(math.log10(value)) // 3))
 
-        return value, "GHz"
+        # Correct rounding errors of the logarithm at the unit boundaries.
+        if idx > 0 and value < self._FREQ_SCALES[idx]:
+            idx -= 1
+        elif idx < len(self._FREQ_UNITS) - 1 and value >= self._FREQ_SCALES[idx + 1]:
+            idx += 1
+
+        return value / self._FREQ_SCALES[idx], self._FREQ_UNITS[idx]
 
 
     def _scale_duration(self, value):
         if value is None:
             return None, None
 
-        v = value
-        for u in [ "s", "ms", "µs", "ns", "ps" ]:
-            if math.fabs(v) >= 1:
-                return v, u
-            v *= 1000
+        magnitude = abs(value)
+        if magnitude >= 1 or magnitude == 0:
+            return value, "s"
+
+        idx = math.ceil(-math.log10(magnitude) / 3)
+        if idx > len(self._DURATION_UNITS):
+            return value, "s"
 
-        return value, "s"
+        # Correct rounding errors of the logarithm at the unit boundaries.
+        if idx > 1 and magnitude * self._DURATION_SCALES[idx - 1] >= 1:
+            idx -= 1
+        elif idx < len(self._DURATION_UNITS) and magnitude * self._DURATION_SCALES[idx] < 1:
+            idx += 1
+
+        if idx >= len(self._DURATION_UNITS):
+            return value, "s"
+
+        return value * self._DURATION_SCALES[idx], self._DURATION_UNITS[idx]
 
 
     def _format_freq(self, value):
@@ -444,22 +733,36 @@ class GPSDO(object):
             )
 
 
-    def _format_freq_line(self, value, err, name, text, fraction):
-        if value is not None:
-            valuefloat = "%10.0f Hz" % value
-            valuefrac  = ("%10d/%4d Hz" % ( value.numerator, value.denominator )) if fraction else ""
-            valueexact = value.denominator == 1
-        else:
-            valuefloat = "---"
-            valuefrac  = "---" if fraction else ""
-            valueexact = True
+    def _format_freq_line_plain(self, value, err, name, text):
+        return "%-6s =                      %13s  %2s %s\n" % \
+            (
+                name,
+                ("%10.0f Hz" % value) if value is not None else "---",
+                "!!" if err is not None else "",
+                text,
+            )
+
+
+    def _format_freq_line_frac(self, value, err, name, text):
+        if value is None:
+            return "%-6s = %18s = %13s  %2s %s\n" % \
+                (
+                    name,
+                    "---",
+                    "---",
+                    "!!" if err is not None else "",
+                    text,
+                )
+
+        num, den = value.numerator, value.denominator
 
-        return "%-6s = %18s %s %13s  %2s %s\n" % \
+        return "%-6s = %10d/%4d Hz %s %10.0f Hz  %2s %s\n" % \
             (
                 name,
-                valuefrac,
-                ("=" if valueexact else "≈") if fraction else " ",
-                valuefloat,
+                num,
+                den,
+                "=" if den == 1 else "≈",
+                value,
                 "!!" if err is not None else "",
                 text,
             )
@@ -498,29 +801,29 @@ class GPSDO(object):
             phaseangleresfloat = "---"
             phaseangleresfrac  = "---"
 
-        result = ""
-        result += "phase  = %18s = %13s     Phase offset output 1 --> 2\n" % \
+        parts = []
+        parts.append("phase  = %18s = %13s     Phase offset output 1 --> 2\n" % \
             (
                 phasefrac,
                 phasefloat,
-            )
-        result += "       = %18s = %13s     Phase angle w.r.t output 2\n" % \
+            ))
+        parts.append("       = %18s = %13s     Phase angle w.r.t output 2\n" % \
             (
                 phaseanglefrac,
                 phaseanglefloat,
-            )
-        result += "pres   = %18s = %13s     Phase offset resolution\n" % \
+            ))
+        parts.append("pres   = %18s = %13s     Phase offset resolution\n" % \
             (
                 phaseresfrac,
                 phaseresfloat,
-            )
-        result += "       = %18s = %13s\n" % \
+            ))
+        parts.append("       = %18s = %13s\n" % \
             (
                 phaseangleresfrac,
                 phaseangleresfloat,
-            )
+            ))
 
-        return result
+        return "".join(parts)
 
 
     def infotext(self, show_freq = True, *args, **kwargs):
@@ -542,46 +845,46 @@ class GPSDO(object):
 
         freq, errdict, errflag = self.freqplan()
 
-        result = ""
-
-        result += "Output settings\n"
-        result += "---------------\n"
-        result += "Output 1:    %11s\n" % ((self._format_freq(freq['fout1']) or "---    ") if self.out1 else "")
-        result += "Output 2:    %11s\n" % ((self._format_freq(freq['fout2']) or "---    ") if self.out2 else "")
-        result += "Phase:       %9s  \n" % ((self._format_phaseangle(freq['phaseangle']) or "---   ") if self.out1 and self.out2 else "")
-        result += "Drive level: %10s \n" % self.LEVEL_DISPLAY[self.level]
-        result += "\n"
-
-        result += "PLL settings\n"
-        result += "------------\n"
-        result += self._format_scaler_line(self.n3,     "N3",     "Input divider factor")
-        result += self._format_scaler_line(self.n2_hs,  "N2_HS",  "Feedback divider factor")
-        result += self._format_scaler_line(self.n2_ls,  "N2_LS",  "")
-        result += self._format_scaler_line(self.n1_hs,  "N1_HS",  "Output common divider factor")
-        result += self._format_scaler_line(self.nc1_ls, "NC1_LS", "Output 1 divider factor")
-        result += self._format_scaler_line(self.nc2_ls, "NC2_LS", "Output 2 divider factor")
-        result += "SKEW   =    %+4d  Clock skew\n"         % self.skew
-        result += "BWSEL  =     %3d  Loop bandwith code\n" % self.bw
-        result += "\n"
-
-        result += "Frequency plan\n"
-        result += "--------------\n"
-        result += self._format_freq_line(self.fin,      errdict['fin'],   "fin",   "GPS reference frequency",  fraction = False)
-        result += self._format_freq_line(freq['f3'],    errdict['f3'],    "f3",    "Phase detector frequency", fraction = True)
-        result += self._format_freq_line(freq['fosc'],  errdict['fosc'],  "fosc",  "Oscillator frequency",     fraction = True)
-        result += self._format_freq_line(freq['fout1'], errdict['fout1'], "fout1", "Output 1 frequency",       fraction = True)
-        result += self._format_freq_line(freq['fout2'], errdict['fout2'], "fout2", "Output 2 frequency",       fraction = True)
-        result += self._format_phase_line(freq['phase'], freq['phaseangle'], freq['phaseres'], freq['phaseangleres'])
+        parts = []
+
+        parts.append("Output settings\n")
+        parts.append("---------------\n")
+        parts.append("Output 1:    %11s\n" % ((self._format_freq(freq['fout1']) or "---    ") if self.out1 else ""))
+        parts.append("Output 2:    %11s\n" % ((self._format_freq(freq['fout2']) or "---    ") if self.out2 else ""))
+        parts.append("Phase:       %9s  \n" % ((self._format_phaseangle(freq['phaseangle']) or "---   ") if self.out1 and self.out2 else ""))
+        parts.append("Drive level: %10s \n" % self.LEVEL_DISPLAY[self.level])
+        parts.append("\n")
+
+        parts.append("PLL settings\n")
+        parts.append("------------\n")
+        parts.append(self._format_scaler_line(self.n3,     "N3",     "Input divider factor"))
+        parts.append(self._format_scaler_line(self.n2_hs,  "N2_HS",  "Feedback divider factor"))
+        parts.append(self._format_scaler_line(self.n2_ls,  "N2_LS",  ""))
+        parts.append(self._format_scaler_line(self.n1_hs,  "N1_HS",  "Output common divider factor"))
+        parts.append(self._format_scaler_line(self.nc1_ls, "NC1_LS", "Output 1 divider factor"))
+        parts.append(self._format_scaler_line(self.nc2_ls, "NC2_LS", "Output 2 divider factor"))
+        parts.append("SKEW   =    %+4d  Clock skew\n"         % self.skew)
+        parts.append("BWSEL  =     %3d  Loop bandwith code\n" % self.bw)
+        parts.append("\n")
+
+        parts.append("Frequency plan\n")
+        parts.append("--------------\n")
+        parts.append(self._format_freq_line_plain(self.fin,     errdict['fin'],   "fin",   "GPS reference frequency" ))
+        parts.append(self._format_freq_line_frac(freq['f3'],    errdict['f3'],    "f3",    "Phase detector frequency"))
+        parts.append(self._format_freq_line_frac(freq['fosc'],  errdict['fosc'],  "fosc",  "Oscillator frequency"    ))
+        parts.append(self._format_freq_line_frac(freq['fout1'], errdict['fout1'], "fout1", "Output 1 frequency"      ))
+        parts.append(self._format_freq_line_frac(freq['fout2'], errdict['fout2'], "fout2", "Output 2 frequency"      ))
+        parts.append(self._format_phase_line(freq['phase'], freq['phaseangle'], freq['phaseres'], freq['phaseangleres']))
 
         if errflag:
-            result += "\n"
-            result += "Errors\n"
-            result += "------\n"
+            parts.append("\n")
+            parts.append("Errors\n")
+            parts.append("------\n")
             for attr, msg in errdict.items():
                 if msg is not None:
-                    result += "%-7s %s\n" % ( attr + ":", msg )
+                    parts.append("%-7s %s\n" % ( attr + ":", msg ))
 
-        return result
+        return "".join(parts)
 
 
     def plltext(self):
@@ -604,38 +907,50 @@ class GPSDO(object):
             'fout2': "fosc / (N1_HS * NC2_LS)",
         }
 
-        result  = ""
-        result += "  fin          f3   +-------+                                       fout1  \n"
-        result += "------> ÷ N3 -----> |       |   fosc                 +-> ÷ NC1_LS -------->\n"
-        result += "                    |  PLL  | --------+--> ÷ N1_HS --|                     \n"
-        result += "          +-------> |       |         |              +-> ÷ NC2_LS -------->\n"
-        result += "          |         +-------+         |                             fout2  \n"
-        result += "          |                           |                                    \n"
-        result += "          +-- ÷ N2_LS <--- ÷ N2_HS <--+                                    \n"
-        result += "\n"
+        parts = [ _PLL_DIAGRAM, "\n" ]
 
         flist = []
         flist.extend([ ( f[0], f[2], f[3] ) for f in self._CONFIG_CHECKS if f[0] == 'fin' ])
         flist.extend([ ( f[0], f[2], f[3] ) for f in self._FREQ_CHECKS                    ])
         for name, fmin, fmax in flist:
-            result += "%-5s = %-30s %s %s ... %s\n" % \
+            parts.append("%-5s = %-30s %s %s ... %s\n" % \
                 (
                     name,
                     formula[name] if name in formula else "",
                     "=" if name in formula else " ",
                     self._format_freq(fmin),
                     self._format_freq(fmax),
-                )
+                ))
 
-        return result
+        return "".join(parts)
 
 
 
 class GPSDODevice(GPSDO):
     """
     GPSDO device bound to an USB device.
+
+    Close the device by the `close()` method or use the instance as a context
+    manager.
     """
 
+    __slots__ = \
+    (
+        'device',
+        'path',
+        'vid',
+        'pid',
+        'manufacturer',
+        'product',
+        'serial',
+        'version_major',
+        'version_minor',
+        'loss_count',
+        'sat_lock',
+        'pll_lock',
+        '_report_buf',
+    )
+
     _COMMAND_OUTPUT   = 1
     _COMMAND_IDENTIFY = 2
     _COMMAND_LEVEL    = 3
@@ -649,13 +964,19 @@ class GPSDODevice(GPSDO):
 
         The method returns the USB device information descriptors of all
         detected GPSDO devices as they are returned by the HID library.
+        Calls in quick succession share the result of a single bus scan. The
+        scan is repeated after a configuration has been written by `write()`.
 
         :returns: USB device information descriptors
         :rtype: list of dict
         """
 
-        for d in hid.enumerate():
-            if ( d['vendor_id'], d['product_id'] ) in USBIDS:
+        now = time.monotonic()
+        if _ENUM_CACHE['v'] is None or now - _ENUM_CACHE['t'] >= _ENUM_CACHE_TTL:
+            _ENUM_CACHE.update(t = now, v = list(_get_hid().enumerate()))
+
+        for d in _ENUM_CACHE['v']:
+            if ( d['vendor_id'], d['product_id'] ) in _USBIDS_SET:
                 yield d
 
 
@@ -753,6 +1074,9 @@ class GPSDODevice(GPSDO):
         self.device = None
         super().__init__()
 
+        # Buffer for outgoing feature reports.
+        self._report_buf = bytearray(60)
+
         # Open device.
         self.path          =  dinfo['path'].decode()
         self.vid           =  dinfo['vendor_id']
@@ -763,12 +1087,41 @@ class GPSDODevice(GPSDO):
         self.version_major = (dinfo['release_number'] & 0xff00) >> 8
         self.version_minor =  dinfo['release_number'] & 0x00ff
 
-        self.device = hid.Device(path = dinfo['path'])
+        self.device = _get_hid().Device(path = dinfo['path'])
 
 
     def __del__(self):
+        # Only a safety net, devices should be closed explicitly.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        """
+        Closes the device.
+
+        The instance can also be used as a context manager, which closes the
+        device on exit.
+
+        .. code-block:: python
+
+            with GPSDODevice.open(serial = "G42610") as d:
+                d.read()
+        """
+
         if self.device is not None:
             self.device.close()
+            self.device = None
 
 
     def read_status(self):
@@ -785,10 +1138,21 @@ class GPSDODevice(GPSDO):
 
         buf = self.device.read(2)
 
-        result = {}
-        result['loss_count'] = self.loss_count = buf[0]
-        result['sat_lock']   = self.sat_lock   = not bool(buf[1] & 0x01)
-        result['pll_lock']   = self.pll_lock   = not bool(buf[1] & 0x02)
+        status     = buf[1]
+        loss_count = buf[0]
+        sat_lock   = (status & 0x01) == 0
+        pll_lock   = (status & 0x02) == 0
+
+        self.loss_count = loss_count
+        self.sat_lock   = sat_lock
+        self.pll_lock   = pll_lock
+
+        result = \
+            {
+                'loss_count': loss_count,
+                'sat_lock':   sat_lock,
+                'pll_lock':   pll_lock,
+            }
 
         return result
 
@@ -815,19 +1179,21 @@ class GPSDODevice(GPSDO):
 
         buf = self.device.get_feature_report(9, 60)
 
-        result = {}
-        result['out1']   = bool(buf[0] & self.OUTPUT1)
-        result['out2']   = bool(buf[0] & self.OUTPUT2)
-        result['level']  = struct.unpack("<B", buf[ 1: 2]               )[0]
-        result['fin']    = struct.unpack("<I", buf[ 2: 5] + bytes([ 0 ]))[0]
-        result['n3']     = struct.unpack("<I", buf[ 5: 8] + bytes([ 0 ]))[0] + 1
-        result['n2_hs']  = struct.unpack("<B", buf[ 8: 9]               )[0] + 4
-        result['n2_ls']  = struct.unpack("<I", buf[ 9:12] + bytes([ 0 ]))[0] + 1
-        result['n1_hs']  = struct.unpack("<B", buf[12:13]               )[0] + 4
-        result['nc1_ls'] = struct.unpack("<I", buf[13:16] + bytes([ 0 ]))[0] + 1
-        result['nc2_ls'] = struct.unpack("<I", buf[16:19] + bytes([ 0 ]))[0] + 1
-        result['skew']   = struct.unpack("<B", buf[19:20]               )[0]
-        result['bw']     = struct.unpack("<B", buf[20:21]               )[0]
+        result = \
+            {
+                'out1':   bool(buf[0] & self.OUTPUT1),
+                'out2':   bool(buf[0] & self.OUTPUT2),
+                'level':       buf[ 1],
+                'fin':    _u24(buf,  2),
+                'n3':     _u24(buf,  5) + 1,
+                'n2_hs':       buf[ 8]  + 4,
+                'n2_ls':  _u24(buf,  9) + 1,
+                'n1_hs':       buf[12]  + 4,
+                'nc1_ls': _u24(buf, 13) + 1,
+                'nc2_ls': _u24(buf, 16) + 1,
+                'skew':        buf[19],
+                'bw':          buf[20],
+            }
 
         if update:
             self.update(**result)
@@ -858,7 +1224,7 @@ class GPSDODevice(GPSDO):
         return result
 
 
-    def write(self, overwrite = False, ignore_freq_limits = False):
+    def write(self, overwrite = False, ignore_freq_limits = False, configdict = None):
         """
         Write configuration to the device.
 
@@ -874,6 +1240,13 @@ class GPSDODevice(GPSDO):
         :param overwrite: Force updating the configuration.
         :type overwrite: bool
 
+        If the device configuration was already read, it can be passed by
+        `configdict` to skip reading it again.
+
+        :param configdict: Current device configuration as returned by
+                           `read_config()` or `read()`.
+        :type configdict: dict | None
+
         If `ignore_freq_limits` is `True`, no error is raised if an
         intermediate frequency exceeds the limits specified in the datasheet.
 
@@ -891,49 +1264,44 @@ class GPSDODevice(GPSDO):
             raise GPSDOConfigurationException({ a: v for a, v in errdict.items() if v is not None })
 
         # Get current settings from device.
-        configdict = self.read(update = False)
+        if not overwrite and configdict is None:
+            configdict = self.read_config(update = False)
+
+        # Prepare the reports of all changed settings first and send them
+        # back-to-back afterwards.
+        reports = []
 
         # Upload PLL settings.
-        if overwrite or \
-           (self.fin    != configdict['fin'])    or \
-           (self.n3     != configdict['n3'])     or \
-           (self.n2_hs  != configdict['n2_hs'])  or \
-           (self.n2_ls  != configdict['n2_ls'])  or \
-           (self.n1_hs  != configdict['n1_hs'])  or \
-           (self.nc1_ls != configdict['nc1_ls']) or \
-           (self.nc2_ls != configdict['nc2_ls']) or \
-           (self.skew   != configdict['skew'])   or \
-           (self.bw     != configdict['bw']):
-            buf = 60 * [ 0 ]
-            buf[0]     = self._COMMAND_PLL
-            buf[ 1: 4] = struct.pack("<I", self.fin       )[0:3]
-            buf[ 4: 7] = struct.pack("<I", self.n3     - 1)[0:3]
-            buf[ 7: 8] = struct.pack("<B", self.n2_hs  - 4)[0:1]
-            buf[ 8:11] = struct.pack("<I", self.n2_ls  - 1)[0:3]
-            buf[11:12] = struct.pack("<B", self.n1_hs  - 4)[0:1]
-            buf[12:15] = struct.pack("<I", self.nc1_ls - 1)[0:3]
-            buf[15:18] = struct.pack("<I", self.nc2_ls - 1)[0:3]
-            buf[18:19] = struct.pack("<B", self.skew      )[0:1]
-            buf[19:20] = struct.pack("<B", self.bw        )[0:1]
-            self.device.send_feature_report(bytes(buf))
+        pll = _pll_attrs(self)
+        if overwrite or pll != _pll_items(configdict):
+            reports.append(_pll_report(self._COMMAND_PLL, *pll))
 
         # Upload drive level.
         if overwrite or \
            self.level != configdict['level']:
-            buf = 60 * [ 0 ]
+            buf = self._report_buf
+            buf[:] = _REPORT_EMPTY
             buf[0] = self._COMMAND_LEVEL
             buf[1] = self.level
-            self.device.send_feature_report(bytes(buf))
+            reports.append(bytes(buf))
 
         # Upload output settings.
         if overwrite or \
            self.out1 != configdict['out1'] or \
            self.out2 != configdict['out2']:
-            buf = 60 * [ 0 ]
-            buf[0]  = self._COMMAND_OUTPUT
-            buf[1] |= self.OUTPUT1 if self.out1 else 0
-            buf[1] |= self.OUTPUT2 if self.out2 else 0
-            self.device.send_feature_report(bytes(buf))
+            buf = self._report_buf
+            buf[:] = _REPORT_EMPTY
+            buf[0] = self._COMMAND_OUTPUT
+            buf[1] = self._OUTPUT_LUT[(bool(self.out1) << 1) | bool(self.out2)]
+            reports.append(bytes(buf))
+
+        send_feature_report = self.device.send_feature_report
+        for report in reports:
+            send_feature_report(report)
+
+        # Don't hand out a bus scan taken before the device was reconfigured.
+        if reports:
+            _ENUM_CACHE['v'] = None
 
 
     def identify(self, output):
@@ -948,7 +1316,8 @@ class GPSDODevice(GPSDO):
         :type output: int
         """
 
-        buf = 60 * [ 0 ]
+        buf = self._report_buf
+        buf[:] = _REPORT_EMPTY
         buf[0] = self._COMMAND_IDENTIFY
         buf[1] = output
         self.device.send_feature_report(bytes(buf))
@@ -969,31 +1338,32 @@ class GPSDODevice(GPSDO):
         :rtype: str
         """
 
-        result = ""
-
         if show_status:
-            result += "Device information\n"
-            result += "------------------\n"
-            result += "VID, PID:     0x%04x:0x%04x\n" % ( self.pid, self.vid )
-            result += "Device:       %s\n"            % self.path
-            result += "Product:      %s\n"            % self.product
-            result += "Manufacturer: %s\n"            % self.manufacturer
-            result += "S/N:          %s\n"            % self.serial
-            result += "Firmware:     %d.%d\n"         % ( self.version_major, self.version_minor )
-            result += "\n"
-
-            result += "Device status\n"
-            result += "-------------\n"
-            result += "Loss count:   %d\n" % self.loss_count
-            result += "SAT lock:     %s\n" % ( "LOCKED" if self.sat_lock else "unlocked" )
-            result += "PLL lock:     %s\n" % ( "LOCKED" if self.pll_lock else "unlocked" )
-            result += "\n"
-
-        result += super().infotext(*args, **kwargs)
-
-        result = result.strip("\n")
-        if result:
-            result += "\n"
+            result = \
+                (
+                    "Device information\n"
+                    "------------------\n"
+                    f"VID, PID:     0x{self.pid:04x}:0x{self.vid:04x}\n"
+                    f"Device:       {self.path}\n"
+                    f"Product:      {self.product}\n"
+                    f"Manufacturer: {self.manufacturer}\n"
+                    f"S/N:          {self.serial}\n"
+                    f"Firmware:     {self.version_major:d}.{self.version_minor:d}\n"
+                    "\n"
+                    "Device status\n"
+                    "-------------\n"
+                    f"Loss count:   {self.loss_count:d}\n"
+                    f"SAT lock:     {'LOCKED' if self.sat_lock else 'unlocked'}\n"
+                    f"PLL lock:     {'LOCKED' if self.pll_lock else 'unlocked'}\n"
+                )
+
+        text = super().infotext(*args, **kwargs)
+
+        if not show_status:
+            return text
+
+        if text:
+            return result + "\n" + text
 
         return result
 
@@ -1004,110 +1374,133 @@ class GPSDODevice(GPSDO):
 #
 
 def command_list(args):
+    out = []
     for d in GPSDODevice.enumerate():
-        sys.stdout.write("%04x:%04x %-16s  %s  %s\n" % \
-            (
-                d['vendor_id'],
-                d['product_id'],
-                d['path'].decode(),
-                d['serial_number'],
-                d['product_string'],
-            ))
+        out.append(
+            f"{d['vendor_id']:04x}:{d['product_id']:04x} {d['path'].decode():<16}  "
+            f"{d['serial_number']}  {d['product_string']}\n")
+    sys.stdout.write("".join(out))
+
+
+def parallel_read(devices, read):
+    """
+    Calls `read` for all devices in parallel.
+
+    HID transfers block, so devices are read by a thread pool if more than
+    one device is given.
+    """
+
+    if len(devices) <= 1:
+        for d in devices:
+            read(d)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers = min(len(devices), 8)) as executor:
+        list(executor.map(read, devices))
 
 
 def command_status(args):
-    for d in GPSDODevice.openall(serial = args.serial, device = args.device):
-        d.read_status()
-        sys.stdout.write("%-8s  %s: SAT %-8s  PLL %-8s  Loss: %d\n" % \
-            (
-                d.serial,
-                d.path,
-                "locked" if d.sat_lock else "unlocked",
-                "locked" if d.pll_lock else "unlocked",
-                d.loss_count,
-            ))
+    with contextlib.ExitStack() as stack:
+        devices = [ stack.enter_context(d) for d in GPSDODevice.openall(serial = args.serial, device = args.device) ]
+        parallel_read(devices, GPSDODevice.read_status)
+
+        out = []
+        for d in devices:
+            out.append(
+                f"{d.serial!s:<8}  {d.path}: "
+                f"SAT {'locked' if d.sat_lock else 'unlocked':<8}  "
+                f"PLL {'locked' if d.pll_lock else 'unlocked':<8}  "
+                f"Loss: {d.loss_count:d}\n")
+
+    sys.stdout.write("".join(out))
 
 
 def command_detail(args):
-    first = True
-    for d in GPSDODevice.openall(serial = args.serial, device = args.device):
-        d.read()
-        if first:
-            first = False
-        else:
-            sys.stdout.write("\n\n")
-        sys.stdout.write(d.infotext())
+    with contextlib.ExitStack() as stack:
+        devices = [ stack.enter_context(d) for d in GPSDODevice.openall(serial = args.serial, device = args.device) ]
+        parallel_read(devices, GPSDODevice.read)
 
+        out = [ d.infotext() for d in devices ]
+
+    sys.stdout.write("\n\n".join(out))
 
-def command_modify(args):
-    d = GPSDODevice.open(serial = args.serial, device = args.device)
 
-    try:
-        d.read()
-        d.update(**parser_get_config(args))
-        sys.stdout.write(d.infotext(show_status = args.show_status, show_freq = args.show_freq))
-        if not args.pretend:
-            d.write(ignore_freq_limits = args.ignore_freq_limits)
-    except GPSDOConfigurationException as e:
-        sys.stdout.write("Parameter error:\n")
-        sys.stdout.write(e.errortext())
+def command_modify(args):
+    with GPSDODevice.open(serial = args.serial, device = args.device) as d:
+        try:
+            configdict = d.read()
+            d.update(**parser_get_config(args))
+            sys.stdout.write(d.infotext(show_status = args.show_status, show_freq = args.show_freq))
+            if not args.pretend:
+                d.write(ignore_freq_limits = args.ignore_freq_limits, configdict = configdict)
+        except GPSDOConfigurationException as e:
+            sys.stdout.write("Parameter error:\n")
+            sys.stdout.write(e.errortext())
 
 
 def command_backup(args):
-    d = GPSDODevice.open(serial = args.serial, device = args.device)
+    import json
 
-    try:
-        d.read()
-        sys.stdout.write(d.infotext(show_status = args.show_status, show_freq = args.show_freq))
-        json.dump(d.asdict(ignore_freq_limits = args.ignore_freq_limits),
-                  args.output_file, indent = 2)
-    except GPSDOConfigurationException as e:
-        sys.stdout.write("Parameter error:\n")
-        sys.stdout.write(e.errortext())
+    with GPSDODevice.open(serial = args.serial, device = args.device) as d:
+        try:
+            d.read()
+            sys.stdout.write(d.infotext(show_status = args.show_status, show_freq = args.show_freq))
+            json.dump(d.asdict(ignore_freq_limits = args.ignore_freq_limits),
+                      args.output_file, indent = 2)
+        except GPSDOConfigurationException as e:
+            sys.stdout.write("Parameter error:\n")
+            sys.stdout.write(e.errortext())
 
 
 def command_restore(args):
-    d = GPSDODevice.open(serial = args.serial, device = args.device)
+    import json
 
-    try:
-        d.update(**json.load(args.input_file))
-        sys.stdout.write(d.infotext(show_status = False, show_freq = args.show_freq))
-        if not args.pretend:
-            d.write(ignore_freq_limits = args.ignore_freq_limits)
-    except GPSDOConfigurationException as e:
-        sys.stdout.write("Parameter error:\n")
-        sys.stdout.write(e.errortext())
+    with GPSDODevice.open(serial = args.serial, device = args.device) as d:
+        try:
+            d.update(**json.load(args.input_file))
+            sys.stdout.write(d.infotext(show_status = False, show_freq = args.show_freq))
+            if not args.pretend:
+                d.write(ignore_freq_limits = args.ignore_freq_limits)
+        except GPSDOConfigurationException as e:
+            sys.stdout.write("Parameter error:\n")
+            sys.stdout.write(e.errortext())
 
 
 def command_identify(args):
-    d = GPSDODevice.open(serial = args.serial, device = args.device)
-    d.identify(args.out)
+    with GPSDODevice.open(serial = args.serial, device = args.device) as d:
+        d.identify(args.out)
 
 
 def command_analyze(args):
+    import json
+
     if args.input_device or args.output_device:
-        d = GPSDODevice.open(serial = args.serial, device = args.device)
+        context = GPSDODevice.open(serial = args.serial, device = args.device)
     else:
-        d = GPSDO()
+        context = contextlib.nullcontext(GPSDO())
 
-    try:
-        if args.input_device:
-            d.read()
-        elif args.input_file:
-            d.update(**json.load(args.input_file))
+    with context as d:
+        try:
+            configdict = None
+            if args.input_device:
+                configdict = d.read()
+            elif args.input_file:
+                d.update(**json.load(args.input_file))
 
-        d.update(**parser_get_config(args))
-        sys.stdout.write(d.infotext(show_status = False))
+            d.update(**parser_get_config(args))
+            sys.stdout.write(d.infotext(show_status = False))
 
-        if args.output_device:
-            d.write(ignore_freq_limits = args.ignore_freq_limits)
-        elif args.output_file:
-            json.dump(d.asdict(ignore_freq_limits = args.ignore_freq_limits),
-                      args.output_file, indent = 2)
-            
-    except GPSDOConfigurationException as e:
-        sys.stdout.write("Parameter error:\n")
-        sys.stdout.write(e.errortext())
+            if args.output_device:
+                d.write(ignore_freq_limits = args.ignore_freq_limits, configdict = configdict)
+            elif args.output_file:
+                json.dump(d.asdict(ignore_freq_limits = args.ignore_freq_limits),
+                          args.output_file, indent = 2)
+
+        except GPSDOConfigurationException as e:
+            sys.stdout.write("Parameter error:\n")
+            sys.stdout.write(e.errortext())
 
 
 def command_pll(args):
@@ -1316,10 +1709,13 @@ def parser_add_ignore_freq_limits(p):
         help = "Ignore frequency limits specified in the datasheet")
 
 
+_CFG_ATTRS  = ( 'fin', 'n3', 'n2_hs', 'n2_ls', 'n1_hs', 'nc1_ls', 'nc2_ls', 'skew', 'bw', 'out1', 'out2' )
+_CFG_GETTER = operator.attrgetter(*_CFG_ATTRS)
+
+
 def parser_get_config(args):
-    result = {}
-    for attr in [ 'fin', 'n3', 'n2_hs', 'n2_ls', 'n1_hs', 'nc1_ls', 'nc2_ls', 'skew', 'bw', 'out1', 'out2' ]:
-        result[attr] = getattr(args, attr, None)
+    # All attributes are defined by `parser_add_config()`.
+    result = dict(zip(_CFG_ATTRS, _CFG_GETTER(args)))
 
     level = getattr(args, 'level', None)
     if level is not None:
@@ -1332,130 +1728,140 @@ def parser_get_config(args):
 # Command Line Parser Definition
 #
 
-parser = argparse.ArgumentParser()
+def parser_setup_list(p):
+    p.set_defaults(func = command_list)
 
-subparsers = parser.add_subparsers()
 
+def parser_setup_status(p):
+    parser_add_device(p)
+    p.set_defaults(func = command_status)
 
-parser_list = subparsers.add_parser(
-    'list',
-    aliases = [ 'l' ],
-    help = "List devices")
 
-parser_list.set_defaults(func = command_list)
+def parser_setup_detail(p):
+    parser_add_device(p)
+    p.set_defaults(func = command_detail)
 
 
-parser_status = subparsers.add_parser(
-    'status',
-    aliases = [ 's' ],
-    help = "Show lock status of a device")
+def parser_setup_modify(p):
+    parser_add_device(p)
+    parser_add_pretend(p)
+    parser_add_show_status(p)
+    parser_add_show_freq(p)
+    parser_add_config(p)
+    parser_add_ignore_freq_limits(p)
+    p.set_defaults(func = command_modify)
 
-parser_add_device(parser_status)
-parser_status.set_defaults(func = command_status)
 
+def parser_setup_backup(p):
+    parser_add_device(p)
+    parser_add_show_status(p)
+    parser_add_show_freq(p)
+    parser_add_ignore_freq_limits(p)
+    parser_add_output(p, required = True)
+    p.set_defaults(func = command_backup)
 
-parser_detail = subparsers.add_parser(
-    'detail',
-    aliases = [ 'd' ],
-    help = "Show details of a device")
 
-parser_add_device(parser_detail)
-parser_detail.set_defaults(func = command_detail)
+def parser_setup_restore(p):
+    parser_add_device(p)
+    parser_add_pretend(p)
+    parser_add_show_freq(p)
+    parser_add_ignore_freq_limits(p)
+    parser_add_input(p, required = True)
+    p.set_defaults(func = command_restore)
 
 
-parser_modify = subparsers.add_parser(
-    'modify',
-    aliases = [ 'm' ],
-    help = "Change configuration of a single device")
+def parser_setup_identify(p):
+    parser_add_device(p)
 
-parser_add_device(parser_modify)
-parser_add_pretend(parser_modify)
-parser_add_show_status(parser_modify)
-parser_add_show_freq(parser_modify)
-parser_add_config(parser_modify)
-parser_add_ignore_freq_limits(parser_modify)
-parser_modify.set_defaults(func = command_modify)
+    parser_identify_output = p.add_mutually_exclusive_group(required = True)
 
+    parser_identify_output.add_argument(
+        '--off',
+        dest = 'out',
+        action = 'store_const',
+        const = 0,
+        help = "Disable Identification")
 
-parser_backup = subparsers.add_parser(
-    'backup',
-    aliases = [ 'b' ],
-    help = "Save configuration of a device")
+    parser_identify_output.add_argument(
+        '--out1',
+        dest = 'out',
+        action = 'store_const',
+        const = GPSDODevice.OUTPUT1,
+        help = "Channel 1")
 
-parser_add_device(parser_backup)
-parser_add_show_status(parser_backup)
-parser_add_show_freq(parser_backup)
-parser_add_ignore_freq_limits(parser_backup)
-parser_add_output(parser_backup, required = True)
-parser_backup.set_defaults(func = command_backup)
+    parser_identify_output.add_argument(
+        '--out2',
+        dest = 'out',
+        action = 'store_const',
+        const = GPSDODevice.OUTPUT2,
+        help = "Channel 2")
 
+    p.set_defaults(func = command_identify)
 
-parser_restore = subparsers.add_parser(
-    'restore',
-    aliases = [ 'r' ],
-    help = "Restore configuration of a device")
 
-parser_add_device(parser_restore)
-parser_add_pretend(parser_restore)
-parser_add_show_freq(parser_restore)
-parser_add_ignore_freq_limits(parser_restore)
-parser_add_input(parser_restore, required = True)
-parser_restore.set_defaults(func = command_restore)
+def parser_setup_analyze(p):
+    parser_add_device(p)
+    parser_add_multiinput(p)
+    parser_add_multioutput(p)
+    parser_add_config(p)
+    parser_add_ignore_freq_limits(p)
+    p.set_defaults(func = command_analyze)
 
 
-parser_identify = subparsers.add_parser(
-    'identify',
-    aliases = [ 'i' ],
-    help = "Identify output channel of a device")
+def parser_setup_pll(p):
+    parser_add_config(p)
+    p.set_defaults(func = command_pll)
 
-parser_add_device(parser_identify)
 
-parser_identify_output = parser_identify.add_mutually_exclusive_group(required = True)
+#
+# The arguments of a subcommand are only defined if the subcommand is actually
+# called.
+#
 
-parser_identify_output.add_argument(
-    '--off',
-    dest = 'out',
-    action = 'store_const',
-    const = 0,
-    help = "Disable Identification")
+PARSER_COMMANDS = \
+[
+    ( 'list',     [ 'l' ], "List devices",                            parser_setup_list     ),
+    ( 'status',   [ 's' ], "Show lock status of a device",            parser_setup_status   ),
+    ( 'detail',   [ 'd' ], "Show details of a device",                parser_setup_detail   ),
+    ( 'modify',   [ 'm' ], "Change configuration of a single device", parser_setup_modify   ),
+    ( 'backup',   [ 'b' ], "Save configuration of a device",          parser_setup_backup   ),
+    ( 'restore',  [ 'r' ], "Restore configuration of a device",       parser_setup_restore  ),
+    ( 'identify', [ 'i' ], "Identify output channel of a device",     parser_setup_identify ),
+    ( 'analyze',  [ 'a' ], "Analyze a configuration",                 parser_setup_analyze  ),
+    ( 'pll',      [ 'p' ], "Show PLL diagram",                        parser_setup_pll      ),
+]
 
-parser_identify_output.add_argument(
-    '--out1',
-    dest = 'out',
-    action = 'store_const',
-    const = GPSDODevice.OUTPUT1,
-    help = "Channel 1")
 
-parser_identify_output.add_argument(
-    '--out2',
-    dest = 'out',
-    action = 'store_const',
-    const = GPSDODevice.OUTPUT2,
-    help = "Channel 2")
+def parser_build(argv):
+    parser = argparse.ArgumentParser()
 
-parser_identify.set_defaults(func = command_identify)
+    subparsers = parser.add_subparsers()
 
+    command = argv[0] if argv else None
+    for name, aliases, text, setup in PARSER_COMMANDS:
+        p = subparsers.add_parser(
+            name,
+            aliases = aliases,
+            help = text)
 
-parser_analyze = subparsers.add_parser(
-    'analyze',
-    aliases = [ 'a' ],
-    help = "Analyze a configuration")
+        if command == name or command in aliases:
+            setup(p)
 
-parser_add_device(parser_analyze)
-parser_add_multiinput(parser_analyze)
-parser_add_multioutput(parser_analyze)
-parser_add_config(parser_analyze)
-parser_add_ignore_freq_limits(parser_analyze)
-parser_analyze.set_defaults(func = command_analyze)
+    return parser
 
 
-parser_pll = subparsers.add_parser(
-    'pll',
-    aliases = [ 'p' ],
-    help = "Show PLL diagram")
+#
+# Subcommands without any arguments are dispatched directly if they are called
+# without options.
+#
 
-parser_add_config(parser_pll)
-parser_pll.set_defaults(func = command_pll)
+PARSER_SHORTCUTS = \
+{
+    'list': command_list,
+    'l':    command_list,
+    'pll':  command_pll,
+    'p':    command_pll,
+}
 
 
 
@@ -1464,8 +1870,12 @@ parser_pll.set_defaults(func = command_pll)
 #
 
 if __name__ == '__main__':
-    args = parser.parse_args()
-    if 'func' in args:
-        args.func(args)
+    if len(sys.argv) == 2 and sys.argv[1] in PARSER_SHORTCUTS:
+        PARSER_SHORTCUTS[sys.argv[1]](argparse.Namespace())
     else:
-        parser.print_help()
+        parser = parser_build(sys.argv[1:])
+        args = parser.parse_args()
+        if 'func' in args:
+            args.func(args)
+        else:
+            parser.print_help()